@@ -0,0 +1,45 @@
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import google.generativeai as genai
+import streamlit as st
+
+# Use the latest and most capable flash model
+MODEL_NAME = "gemini-2.5-flash"
+
+# Each streaming call holds a worker until its reply is complete, and the work is network-bound,
+# so the pool is sized for concurrent users rather than CPU count. Override with GEMINI_MAX_WORKERS.
+MAX_WORKERS = int(os.environ.get("GEMINI_MAX_WORKERS", "64"))
+
+# --- Gemini API Configuration ---
+@functools.cache
+def configure_api_key():
+    """Configures Gemini once per process from the environment or Streamlit secrets."""
+    # It's highly recommended to set your API key as a Streamlit secret
+    # for security and ease of deployment.
+    # In your Streamlit Cloud dashboard, add a secret with the key "GEMINI_API_KEY".
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key and st.secrets.load_if_toml_exists():
+        api_key = st.secrets.get("GEMINI_API_KEY")
+    if not api_key:
+        st.error(
+            "🚨 Gemini API key not found. "
+            "Please set the `GEMINI_API_KEY` environment variable or add it to your Streamlit secrets.",
+            icon="🚨"
+        )
+        # st.stop() raises, so nothing is cached and the next rerun checks again
+        st.stop()
+    genai.configure(api_key=api_key)
+
+# --- Model Setup ---
+@functools.cache
+def get_model(system_instruction):
+    """Builds the Gemini model for a system instruction once per process instead of on every rerun."""
+    configure_api_key()
+    return genai.GenerativeModel(MODEL_NAME, system_instruction=system_instruction)
+
+@functools.cache
+def get_executor():
+    """Worker threads shared by every session for Gemini calls, so script runs never block on the network."""
+    return ThreadPoolExecutor(max_workers=MAX_WORKERS)
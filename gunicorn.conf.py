@@ -0,0 +1,12 @@
+# Production server settings for Main.py: gunicorn -c gunicorn.conf.py Main:app
+import os
+
+bind = "0.0.0.0:5000"
+
+# Main:app is an ASGI (Quart) app, so each worker runs an event loop that
+# keeps many in-flight Gemini calls parked instead of one per worker
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = (os.cpu_count() or 1) * 2
+
+# Gemini responses can take several seconds; leave headroom before killing a worker
+timeout = 60
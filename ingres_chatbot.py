@@ -1,28 +1,17 @@
 import streamlit as st
-import google.generativeai as genai
-import os
-import speech_recognition as sr
+import queue
+import threading
+import time
+import numpy as np
+from gemini_config import MODEL_NAME, get_executor, get_model
+from whisper_config import get_whisper_model
 
 # --- Helper Functions ---
-def get_or_init_session_state(key, default_value):
-    """Gets a value from session state or initializes it."""
+def get_or_init_session_state(key, default_factory):
+    """Gets a value from session state or initializes it from default_factory on first access."""
     if key not in st.session_state:
-        st.session_state[key] = default_value
+        st.session_state[key] = default_factory()
     return st.session_state[key]
-# --- Gemini API Configuration ---
-try:
-    # It's highly recommended to set your API key as a Streamlit secret
-    # for security and ease of deployment.
-    # In your Streamlit Cloud dashboard, add a secret with the key "GEMINI_API_KEY".
-    # This correctly fetches the key from an environment variable or a Streamlit secret.
-    genai.configure(api_key=os.environ.get("GEMINI_API_KEY") or st.secrets.get("GEMINI_API_KEY"))
-except (KeyError, FileNotFoundError):
-    st.error(
-        "🚨 Gemini API key not found. "
-        "Please set the `GEMINI_API_KEY` environment variable or add it to your Streamlit secrets.",
-        icon="🚨"
-    )
-    st.stop()
 
 # --- Model Selection and Initialization ---
 # A system instruction to guide the chatbot's behavior
@@ -32,53 +21,197 @@ SYSTEM_PROMPT = (
     "If a question is outside of this scope, politely state that you specialize in INGRES and cannot answer."
 )
 
-# Use the latest and most capable flash model
-MODEL_NAME = "gemini-2.5-flash"
-model = genai.GenerativeModel(MODEL_NAME, system_instruction=SYSTEM_PROMPT)
+# How many past messages are resent to Gemini per turn
+MAX_HISTORY_MESSAGES = 20
+# Chat messages rendered on each rerun before older ones are hidden behind a toggle
+VISIBLE_MESSAGES = 10
+# How often the page re-checks a reply that is still being generated
+POLL_INTERVAL = 0.2
+
+model = get_model(SYSTEM_PROMPT)
 
 # --- Core Functions ---
+def stream_reply(chat_session, prompt, chunks, cancelled):
+    """Runs on a worker thread: streams the reply into chunks until it completes or is cancelled."""
+    # Cancelled while still queued for a worker: skip the call entirely
+    if cancelled.is_set():
+        return None
+    response = chat_session.send_message(prompt, stream=True)
+    for chunk in response:
+        if cancelled.is_set():
+            return None
+        chunks.append(chunk.text)
+    return "".join(chunks)
+
 def handle_prompt(prompt: str):
-    """Handles user prompt, displays it, gets a response, and updates the chat."""
+    """Adds the user prompt to the chat and starts fetching the assistant's reply in the background."""
+    if not prompt or not prompt.strip():
+        return
+    if st.session_state.get("pending"):
+        # Inputs are disabled while a reply is in flight; this only guards against a racing submit
+        return
+    # A repeat of the immediately preceding exchange (e.g. a double submit) reuses its reply;
+    # any other prompt depends on the conversation so far and goes to Gemini
+    last_exchange = st.session_state.get("last_exchange")
+    is_repeat = (
+        last_exchange is not None
+        and last_exchange[0] == prompt
+        and st.session_state.messages[-1:] == [{"role": "assistant", "content": last_exchange[1]}]
+    )
     # Add user message to chat history
     st.session_state.messages.append({"role": "user", "content": prompt})
-    # Display user message in chat message container
-    with st.chat_message("user", avatar="🧑‍💻"):
-        st.markdown(prompt)
 
-    # Display assistant response in chat message container
+    if is_repeat:
+        st.session_state.messages.append({"role": "assistant", "content": last_exchange[1]})
+        st.rerun()
+
+    # Resend only the recent turns so each call's input stays bounded as the chat grows
+    chat_session = st.session_state.chat_session
+    history = chat_session.history[-MAX_HISTORY_MESSAGES:]
+    if len(history) < len(chat_session.history):
+        st.session_state.chat_session = chat_session = model.start_chat(history=history)
+
+    pending = {"prompt": prompt, "history": history, "chunks": [], "cancelled": threading.Event()}
+    pending["future"] = get_executor().submit(
+        stream_reply, chat_session, prompt, pending["chunks"], pending["cancelled"]
+    )
+    st.session_state.pending = pending
+    st.rerun()
+
+def cancel_pending():
+    """Abandons the in-flight reply and restores the chat session to its state before the prompt."""
+    pending = st.session_state.pop("pending", None)
+    if pending:
+        # cancel() drops a call that hasn't started; the event stops one that is already streaming
+        pending["future"].cancel()
+        pending["cancelled"].set()
+        st.session_state.chat_session = model.start_chat(history=pending["history"])
+    return pending
+
+def render_pending():
+    """Shows progress for the in-flight reply, or records it once the worker has finished."""
+    pending = st.session_state.get("pending")
+    if not pending:
+        return
     with st.chat_message("assistant", avatar="🤖"):
-        with st.spinner("Thinking..."):
-            try:
-                response = st.session_state.chat_session.send_message(prompt)
-                bot_reply = response.text
-                st.markdown(bot_reply)
-            except Exception as e:
-                st.error(f"An error occurred: {e}")
-                bot_reply = "Sorry, I ran into a problem. Please try again."
+        future = pending["future"]
+        if not future.done():
+            with st.status("Thinking…", expanded=False) as status:
+                status.write("Contacting Gemini")
+            # Show whatever has streamed in so far
+            st.markdown("".join(pending["chunks"]))
+            if st.button("Cancel", key="cancel_reply"):
+                cancel_pending()
+                bot_reply = "Request cancelled."
                 st.markdown(bot_reply)
+                st.session_state.messages.append({"role": "assistant", "content": bot_reply})
+            return
+
+        del st.session_state.pending
+        try:
+            bot_reply = future.result()
+            st.markdown(bot_reply)
+            st.session_state.last_exchange = (pending["prompt"], bot_reply)
+        except Exception as e:
+            st.error(f"An error occurred: {e}")
+            bot_reply = "Sorry, I ran into a problem. Please try again."
+            st.markdown(bot_reply)
+            st.session_state.chat_session = model.start_chat(history=pending["history"])
 
     # Add assistant response to session state
     st.session_state.messages.append({"role": "assistant", "content": bot_reply})
 
+# --- Live transcription settings ---
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 0.5
+MAX_BUFFER_SECONDS = 30
+SILENCE_SECONDS = 1.0
+NO_SPEECH_TIMEOUT = 5
+MAX_UTTERANCE_SECONDS = 60
+
+def _agreed_prefix(previous, current):
+    """Returns how many leading words two successive transcriptions agree on."""
+    count = 0
+    for old, new in zip(previous, current):
+        if old.word.strip().lower() != new.word.strip().lower():
+            break
+        count += 1
+    return count
+
+def stream_transcription(audio_chunks):
+    """Yields confirmed text from a live microphone feed using LocalAgreement-2.
+
+    The rolling buffer (at most 30 s) is re-transcribed as new audio arrives, and a
+    word is committed only once two successive passes agree on it. Committed
+    audio is trimmed from the front of the buffer. Stops after one second of
+    trailing silence.
+    """
+    model = get_whisper_model()
+    buffer = np.zeros(0, dtype=np.float32)
+    previous = []
+    heard_speech = False
+    started = time.monotonic()
+    while time.monotonic() - started < MAX_UTTERANCE_SECONDS:
+        try:
+            chunks = [audio_chunks.get(timeout=2)]
+        except queue.Empty:
+            break
+        # Recording keeps running while we transcribe; fold in everything captured meanwhile
+        while not audio_chunks.empty():
+            chunks.append(audio_chunks.get_nowait())
+        buffer = np.concatenate([buffer, *chunks])
+        segments, _ = model.transcribe(buffer, beam_size=1, vad_filter=True, word_timestamps=True)
+        words = [word for segment in segments for word in segment.words]
+        trailing_silence = len(buffer) / SAMPLE_RATE - (words[-1].end if words else 0.0)
+        heard_speech = heard_speech or bool(words)
+
+        agreed = _agreed_prefix(previous, words)
+        if agreed:
+            yield "".join(word.word for word in words[:agreed])
+            # Keep only the audio after the last committed word
+            buffer = buffer[int(words[agreed - 1].end * SAMPLE_RATE):]
+            words = words[agreed:]
+        previous = words
+        buffer = buffer[-MAX_BUFFER_SECONDS * SAMPLE_RATE:]
+
+        if heard_speech and trailing_silence >= SILENCE_SECONDS:
+            break
+        if not heard_speech and time.monotonic() - started >= NO_SPEECH_TIMEOUT:
+            break
+    # Flush whatever was still awaiting a second opinion
+    if previous:
+        yield "".join(word.word for word in previous)
+
 def get_voice_input():
-    """Captures and transcribes voice input."""
-    recognizer = sr.Recognizer()
-    st.info("Preparing to listen...", icon="⏳")
-    with sr.Microphone() as source:
+    """Captures voice input and transcribes it live as the user speaks."""
+    audio_chunks = queue.Queue()
+
+    def on_audio(indata, frames, time_info, status):
+        # Runs on PortAudio's thread; hand the block over to the transcription loop
+        audio_chunks.put(indata[:, 0].copy())
+
+    # Load the speech model first so its failures aren't reported as microphone problems
+    get_whisper_model()
+    try:
+        # Importing loads PortAudio, which raises OSError on hosts without it
+        import sounddevice as sd
+        stream = sd.InputStream(samplerate=SAMPLE_RATE, blocksize=int(SAMPLE_RATE * CHUNK_SECONDS), channels=1,
+                                dtype="float32", callback=on_audio)
+    except (ImportError, OSError) as e:
+        st.error(f"Could not access the microphone; {e}")
+        return None
+    except sd.PortAudioError as e:
+        st.error(f"Could not access the microphone; {e}")
+        return None
+    with stream:
         st.info("Listening... Speak now!", icon="🎤")
-        try:
-            audio = recognizer.listen(source, timeout=5, phrase_time_limit=10)
-            st.info("Transcribing...", icon="✍️")
-            text = recognizer.recognize_google(audio)
-            st.success(f"You said: \"{text}\"")
-            return text
-        except sr.WaitTimeoutError:
-            st.warning("No speech detected. Please try again.")
-        except sr.UnknownValueError:
-            st.error("Sorry, I could not understand the audio. Please speak clearly.")
-        except sr.RequestError as e:
-            st.error(f"Could not request results from Google Speech Recognition service; {e}")
-    return None
+        text = st.write_stream(stream_transcription(audio_chunks))
+    text = text.strip() if isinstance(text, str) else ""
+    if not text:
+        st.warning("No speech detected. Please try again.")
+        return None
+    st.success(f"You said: \"{text}\"")
+    return text
 
 # --- Streamlit App UI ---
 st.set_page_config(page_title="INGRES Virtual Assistant", page_icon="🤖")
@@ -90,11 +223,13 @@ st.caption(f"Powered by Google Gemini {MODEL_NAME.replace('2.5', '1.5')}")
 with st.sidebar:
     st.header("Settings")
     if st.button("Clear Chat History", use_container_width=True):
+        cancel_pending()
         st.session_state.messages = []
         st.session_state.chat_session = model.start_chat(history=[])
+        st.session_state.pop("last_exchange", None)
         st.rerun()
     st.markdown("---")
-    if st.button("🎤 Speak to Assistant", use_container_width=True):
+    if st.button("🎤 Speak to Assistant", use_container_width=True, disabled=bool(st.session_state.get("pending"))):
         voice_prompt = get_voice_input()
         if voice_prompt:
             handle_prompt(voice_prompt)
@@ -105,16 +240,31 @@ with st.sidebar:
     )
 
 # Initialize chat session in Streamlit's session state
-get_or_init_session_state("messages", [
+get_or_init_session_state("messages", lambda: [
     {"role": "assistant", "content": "Hello! I am your INGRES virtual assistant. How can I help you?"}
 ])
-get_or_init_session_state("chat_session", model.start_chat(history=[]))
+get_or_init_session_state("chat_session", lambda: model.start_chat(history=[]))
 
-# Display chat messages from history on app rerun
-for message in st.session_state.messages:
+def render_message(message):
+    """Renders a single chat message from history."""
     with st.chat_message(message["role"], avatar="🧑‍💻" if message["role"] == "user" else "🤖"):
         st.markdown(message["content"])
 
+# Display chat messages from history on app rerun; only the most recent ones are rendered by default
+older = st.session_state.messages[:-VISIBLE_MESSAGES]
+if older and st.toggle(f"Show earlier {len(older)} messages", key="show_older"):
+    for message in older:
+        render_message(message)
+for message in st.session_state.messages[-VISIBLE_MESSAGES:]:
+    render_message(message)
+
+render_pending()
+
 # Handle text input at the bottom of the main page
-if prompt := st.chat_input("Your message..."):
+if prompt := st.chat_input("Your message...", disabled=bool(st.session_state.get("pending"))):
     handle_prompt(prompt)
+
+# Keep polling while a reply is being generated in the background
+if st.session_state.get("pending"):
+    time.sleep(POLL_INTERVAL)
+    st.rerun()
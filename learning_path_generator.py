@@ -1,26 +1,11 @@
 import streamlit as st
-import google.generativeai as genai
-import os
-from PIL import Image
 import io
-import speech_recognition as sr
-
-# --- Gemini API Configuration ---
-try:
-    api_key = os.environ.get("GEMINI_API_KEY")
-    st.secrets.load_if_toml_exists()
-    if not api_key and st.secrets.get("GEMINI_API_KEY"):
-        api_key = st.secrets["GEMINI_API_KEY"]
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY not found.")
-    genai.configure(api_key=api_key)
-except (ValueError, TypeError) as e:
-    st.error(
-        "🚨 Gemini API key not found. "
-        "Please set the `GEMINI_API_KEY` environment variable or add it to your Streamlit secrets.",
-        icon="🚨"
-    )
-    st.stop()
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
+import numpy as np
+from streamlit.runtime.uploaded_file_manager import UploadedFile
+from gemini_config import get_executor, get_model
+from whisper_config import get_whisper_model
 
 # --- Model Setup ---
 SYSTEM_PROMPT = (
@@ -30,12 +15,11 @@ SYSTEM_PROMPT = (
     "Be friendly, supportive, and always encourage the user. "
     "If a user uploads a resume or skill list, analyze it and use it to personalize the learning path. "
 )
-MODEL_NAME = "gemini-2.5-flash"
-model = genai.GenerativeModel(MODEL_NAME, system_instruction=SYSTEM_PROMPT)
+model = get_model(SYSTEM_PROMPT)
 
 # --- UI Setup ---
 st.set_page_config(page_title="AI-Powered Personalized Learning Path Generator", page_icon="🎓", layout="wide")
-st.markdown("""
+PAGE_CSS = """
     <style>
     .main {background-color: #f5f7fa;}
     .stButton>button {background-color: #4F8BF9; color: white; font-weight: bold;}
@@ -51,7 +35,8 @@ st.markdown("""
         padding: 12px;
     }
     </style>
-    """, unsafe_allow_html=True)
+    """
+st.markdown(PAGE_CSS, unsafe_allow_html=True)
 
 
 st.title("🎓 AI-Powered Personalized Learning Path Generator")
@@ -105,12 +90,22 @@ else:
 
 
 # --- Helper: Get file content ---
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Keyed on the upload's id so reruns don't re-parse the same file
+@st.cache_data(hash_funcs={UploadedFile: lambda f: f.file_id}, show_spinner="Reading your file...")
 def get_file_content(file):
     if file is None:
         return ""
     try:
         if file.type == "text/plain":
             return file.getvalue().decode("utf-8")
+        elif file.type == "application/pdf":
+            from pdfminer.high_level import extract_text
+            return extract_text(io.BytesIO(file.getvalue()))
+        elif file.type == DOCX_MIME_TYPE:
+            from docx import Document
+            return "\n".join(p.text for p in Document(io.BytesIO(file.getvalue())).paragraphs)
         else:
             return "[Uploaded file type not supported for preview, but will be used for personalization.]"
     except Exception:
@@ -128,9 +123,13 @@ OPEN_SOURCE_LINKS = [
     {"name": "Stanford Online", "url": "https://online.stanford.edu/"},
 ]
 
+@st.cache_data(show_spinner=False)
+def get_links_markdown():
+    """Builds the resource list once so the expander renders a single markdown element."""
+    return "\n".join(f"- [{resource['name']}]({resource['url']})" for resource in OPEN_SOURCE_LINKS)
+
 with st.expander("💡 Explore Open Source Learning Resources"):
-    for resource in OPEN_SOURCE_LINKS:
-        st.markdown(f"- [{resource['name']}]({resource['url']})")
+    st.markdown(get_links_markdown())
 
 # --- Interactive Chat Section ---
 st.markdown("---")
@@ -139,37 +138,131 @@ st.subheader("📝 Your Personalized Learning Path")
 if 'learning_path' not in st.session_state:
     st.session_state['learning_path'] = ""
 
+LEARNING_PATH_SECTIONS = [
+    "Break the path into clear, numbered steps with a short explanation and a suggested timeline for each.",
+    "Recommend open-source and free learning resources for each step, formatted as a list with links.",
+    "Provide checkpoints and milestones, and suggest how the user can track progress. Always encourage the user.",
+]
+
+def _stream_section(prompt, chunks, cancelled):
+    """Runs on a worker thread: streams one section's text into chunks until done or cancelled."""
+    if cancelled.is_set():
+        return None
+    for chunk in model.generate_content(prompt, stream=True):
+        if cancelled.is_set():
+            return None
+        chunks.append(chunk.text)
+    return "".join(chunks)
+
+def _generate_sections(prompts):
+    # Fan the section prompts out concurrently; wall-clock is the slowest section, not the sum
+    chunks = [[] for _ in prompts]
+    cancelled = threading.Event()
+    futures = [get_executor().submit(_stream_section, p, c, cancelled) for p, c in zip(prompts, chunks)]
+    placeholders = [st.empty() for _ in prompts]
+    shown = [0] * len(prompts)
+    try:
+        pending = futures
+        while pending:
+            _, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            # Render chunks as they arrive; Streamlit elements are only touched from the script thread
+            for i, placeholder in enumerate(placeholders):
+                if len(chunks[i]) != shown[i]:
+                    shown[i] = len(chunks[i])
+                    placeholder.markdown("".join(chunks[i]))
+        return [future.result() for future in futures]
+    finally:
+        # If the run was interrupted (e.g. an input changed), free the workers instead of finishing unused calls
+        cancelled.set()
+        for future in futures:
+            future.cancel()
+        # The finished plan is rendered from session state, so drop the live previews
+        for placeholder in placeholders:
+            placeholder.empty()
+
+@st.cache_data(ttl=24 * 60 * 60, max_entries=256, show_spinner=False)
 def generate_learning_path(goal, skills, preferences, resume):
     # Validate input
     if not goal or goal.strip() == "":
         return "Please enter a learning goal to get started."
-    prompt = (
+    context = (
         f"You are an AI learning path generator.\n"
         f"User Goal: {goal}\n"
         f"User Skills: {skills}\n"
         f"User Preferences: {preferences}\n"
         f"Resume/Skill List: {resume}\n"
-        "Generate a clear, concise, and actionable learning path for the user. "
-        "Break the path into steps, recommend open-source resources, and provide checkpoints. "
-        "Format the output as a numbered list with explanations and links. "
-        "Always encourage the user and suggest how to track progress."
     )
-    try:
-        response = model.generate_content(prompt)
-        # Check for valid response
-        if hasattr(response, "text") and response.text and response.text.strip():
-            return response.text
-        else:
-            return "Sorry, the AI could not generate a learning path. Please try again with more details or check your API quota."
-    except Exception as e:
-        return f"Error generating learning path: {e}"
+    prompts = [context + section for section in LEARNING_PATH_SECTIONS]
+    # Failures raise rather than return a message, so st.cache_data never stores them
+    responses = _generate_sections(prompts)
+    # Check for valid responses
+    sections = [text.strip() for text in responses if text and text.strip()]
+    if not sections:
+        raise ValueError("Sorry, the AI could not generate a learning path. Please try again with more details or check your API quota.")
+    return "\n\n".join(sections)
+
+WHISPER_SAMPLE_RATE = 16000
+
+def _to_whisper_input(block, samplerate):
+    """Converts a block of audio frames to 16 kHz mono float32, as Whisper expects."""
+    audio = block.mean(axis=1)
+    if samplerate != WHISPER_SAMPLE_RATE:
+        # Linear resampling is plenty for speech
+        duration = len(audio) / samplerate
+        target = np.linspace(0, duration, int(duration * WHISPER_SAMPLE_RATE), endpoint=False)
+        audio = np.interp(target, np.arange(len(audio)) / samplerate, audio)
+    return audio.astype(np.float32)
+
+# Keyed on the upload's id so reruns don't transcribe the same clip again
+@st.cache_data(hash_funcs={UploadedFile: lambda f: f.file_id}, show_spinner=False)
+def transcribe_audio_file(audio_file):
+    """Transcribes an uploaded WAV file, showing the text segment by segment as it is recognised."""
+    # Imported here so reruns that never touch voice input skip loading libsndfile
+    import soundfile as sf
+
+    with sf.SoundFile(audio_file) as wav:
+        blocks = [_to_whisper_input(block, wav.samplerate)
+                  for block in wav.blocks(blocksize=wav.samplerate, dtype="float32", always_2d=True)]
+    audio = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+
+    # The clip is complete, so transcribe it once; segments are decoded lazily as we iterate
+    segments, _ = get_whisper_model().transcribe(audio, beam_size=1, vad_filter=True)
+    placeholder = st.empty()
+    text = ""
+    for segment in segments:
+        text += segment.text
+        placeholder.markdown(f"🎙️ {text}")
+    placeholder.empty()
+    return text.strip()
+
+@st.cache_data(ttl=24 * 60 * 60, max_entries=256, show_spinner="Thinking…")
+def ask_assistant(learning_path, question):
+    """Answers a follow-up question about a learning path; identical questions are served from cache."""
+    context = f"User's learning path: {learning_path}\nUser's question: {question}"
+    response = model.generate_content(context)
+    if hasattr(response, "text") and response.text and response.text.strip():
+        return response.text
+    raise ValueError("Sorry, the AI could not answer. Please try again or rephrase your question.")
 
 
 # --- Interactive Generation and Feedback ---
 if goal:
-    if st.button("🚀 Generate My Learning Path", use_container_width=True):
+    col_generate, col_regenerate = st.columns([0.8, 0.2])
+    with col_generate:
+        generate_clicked = st.button("🚀 Generate My Learning Path", use_container_width=True)
+    with col_regenerate:
+        regenerate_clicked = st.button("🔄 Regenerate", use_container_width=True, help="Ignore the cached plan and ask Gemini for a fresh one")
+    if generate_clicked or regenerate_clicked:
         resume_content = get_file_content(uploaded_file)
-        learning_path = generate_learning_path(goal, skills, preferences, resume_content)
+        if regenerate_clicked:
+            # Drop only this input's cached plan; other users' plans stay cached
+            generate_learning_path.clear(goal, skills, preferences, resume_content)
+        try:
+            learning_path = generate_learning_path(goal, skills, preferences, resume_content)
+        except ValueError as e:
+            learning_path = str(e)
+        except Exception as e:
+            learning_path = f"Error generating learning path: {e}"
         st.session_state['learning_path'] = learning_path
 
 if st.session_state.get('learning_path'):
@@ -200,28 +293,23 @@ if st.session_state.get('learning_path'):
     audio_file = st.file_uploader("Upload a voice message (WAV format, <30s)", type=["wav"], key="voice_input")
     voice_text = None
     if audio_file is not None:
-        recognizer = sr.Recognizer()
-        with sr.AudioFile(audio_file) as source:
-            audio = recognizer.record(source)
         try:
-            voice_text = recognizer.recognize_google(audio)
-            st.success(f"Transcribed voice: {voice_text}")
-        except sr.UnknownValueError:
-            st.error("Sorry, could not understand the audio.")
-        except sr.RequestError as e:
-            st.error(f"Could not request results from Google Speech Recognition service; {e}")
+            voice_text = transcribe_audio_file(audio_file) or None
+            if voice_text:
+                st.success(f"Transcribed voice: {voice_text}")
+            else:
+                st.error("Sorry, could not understand the audio.")
+        except Exception as e:
+            st.error(f"Could not transcribe the audio file; {e}")
 
     # Use either text or voice input
     final_message = user_message if user_message else (voice_text if voice_text else None)
     if st.button("Ask AI", key="ask_ai_btn") and final_message:
-        # Compose context for the assistant
-        context = f"User's learning path: {st.session_state['learning_path']}\nUser's question: {final_message}"
         try:
-            response = model.generate_content(context)
-            if hasattr(response, "text") and response.text and response.text.strip():
-                st.session_state['assistant_history'].append((final_message, response.text))
-            else:
-                st.session_state['assistant_history'].append((final_message, "Sorry, the AI could not answer. Please try again or rephrase your question."))
+            answer = ask_assistant(st.session_state['learning_path'], final_message)
+            st.session_state['assistant_history'].append((final_message, answer))
+        except ValueError as e:
+            st.session_state['assistant_history'].append((final_message, str(e)))
         except Exception as e:
             st.session_state['assistant_history'].append((final_message, f"Error: {e}"))
 
@@ -0,0 +1,12 @@
+import streamlit as st
+
+# Local faster-whisper model used by both apps: int8 on CPU, no network round-trip
+WHISPER_MODEL_SIZE = "small"
+WHISPER_DEVICE = "cpu"
+WHISPER_COMPUTE_TYPE = "int8"
+
+@st.cache_resource(show_spinner="Loading speech model...")
+def get_whisper_model():
+    """Loads the local faster-whisper model once per process."""
+    from faster_whisper import WhisperModel
+    return WhisperModel(WHISPER_MODEL_SIZE, device=WHISPER_DEVICE, compute_type=WHISPER_COMPUTE_TYPE)